@@ -0,0 +1,163 @@
+"""
+Admission control middleware
+Per-route concurrency limits (with a bounded wait queue) and token-bucket
+rate limits. Limits apply per worker process and are read from settings.
+"""
+import asyncio
+import json
+import math
+import time
+from fnmatch import fnmatchcase
+from typing import Dict, Optional
+
+from config import RouteLimit, get_settings
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at `rate` tokens per second"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = float(burst)
+        self.updated_at = time.monotonic()
+
+    def try_acquire(self) -> Optional[float]:
+        """Take a token; return None on success or seconds until one is available"""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return None
+        return (1 - self.tokens) / self.rate
+
+
+class RouteGate:
+    """Admission state and metrics for one configured route"""
+
+    def __init__(self, pattern: str, limit: RouteLimit):
+        self.pattern = pattern
+        self.limit = limit
+        self.semaphore = asyncio.Semaphore(limit.concurrency) if limit.concurrency else None
+        self.bucket = (
+            TokenBucket(limit.rate, limit.burst or max(1, math.ceil(limit.rate)))
+            if limit.rate else None
+        )
+        # Metrics
+        self.in_flight = 0
+        self.queued = 0
+        self.max_queued = 0
+        self.admitted = 0
+        self.rate_limited = 0
+        self.queue_full = 0
+        self.queue_timeouts = 0
+
+    def metrics(self) -> dict:
+        return {
+            "concurrency_limit": self.limit.concurrency,
+            "queue_size": self.limit.queue_size,
+            "in_flight": self.in_flight,
+            "queue_depth": self.queued,
+            "max_queue_depth": self.max_queued,
+            "admitted": self.admitted,
+            "rejected_rate_limited": self.rate_limited,
+            "rejected_queue_full": self.queue_full,
+            "rejected_queue_timeout": self.queue_timeouts,
+        }
+
+
+# Gates for the running process, keyed by route pattern
+_gates: Dict[str, RouteGate] = {}
+
+
+def get_admission_metrics() -> dict:
+    """Snapshot of per-route admission metrics for this worker"""
+    return {pattern: gate.metrics() for pattern, gate in _gates.items()}
+
+
+async def _reject(send, status_code: int, detail: str, retry_after: float):
+    """Send a JSON error response with a Retry-After header"""
+    body = json.dumps({"detail": detail}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status_code,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class AdmissionControlMiddleware:
+    """ASGI middleware enforcing the configured per-route limits"""
+
+    def __init__(self, app, route_limits: Optional[Dict[str, RouteLimit]] = None):
+        self.app = app
+        if route_limits is None:
+            route_limits = get_settings().route_limits
+        _gates.clear()
+        for pattern, limit in route_limits.items():
+            _gates[pattern] = RouteGate(pattern, limit)
+
+    def _match(self, method: str, path: str) -> Optional[RouteGate]:
+        key = f"{method} {path.rstrip('/') or '/'}"
+        for pattern, gate in _gates.items():
+            if fnmatchcase(key, pattern):
+                return gate
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        gate = self._match(scope["method"], scope["path"])
+        if gate is None:
+            await self.app(scope, receive, send)
+            return
+
+        if gate.bucket is not None:
+            wait = gate.bucket.try_acquire()
+            if wait is not None:
+                gate.rate_limited += 1
+                await _reject(send, 429, "Too many requests, please retry later", wait)
+                return
+
+        if gate.semaphore is None:
+            await self._dispatch(gate, scope, receive, send)
+            return
+
+        if gate.semaphore.locked():
+            if gate.queued >= gate.limit.queue_size:
+                gate.queue_full += 1
+                await _reject(send, 503, "Server busy, please retry later", gate.limit.queue_timeout)
+                return
+
+            gate.queued += 1
+            gate.max_queued = max(gate.max_queued, gate.queued)
+            try:
+                await asyncio.wait_for(gate.semaphore.acquire(), gate.limit.queue_timeout)
+            except asyncio.TimeoutError:
+                gate.queue_timeouts += 1
+                await _reject(send, 503, "Server busy, please retry later", gate.limit.queue_timeout)
+                return
+            finally:
+                gate.queued -= 1
+        else:
+            await gate.semaphore.acquire()
+
+        try:
+            await self._dispatch(gate, scope, receive, send)
+        finally:
+            gate.semaphore.release()
+
+    async def _dispatch(self, gate: RouteGate, scope, receive, send):
+        gate.admitted += 1
+        gate.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            gate.in_flight -= 1
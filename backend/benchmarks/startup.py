@@ -0,0 +1,168 @@
+"""
+Startup benchmark
+Measures worker cold-start timings on a scratch database of the configured
+MongoDB (its indexes and migration marker are dropped between runs).
+
+Run from the backend directory:
+
+    python -m benchmarks.startup --workers 4 --database hrms_lite_bench
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from config import get_settings
+
+
+async def cold_start(run_index_migrations: bool) -> dict:
+    """Time a single worker boot, first query and cache warm-up"""
+    timings = {}
+
+    start = time.perf_counter()
+    import main  # noqa: F401  (import cost of the app and routers)
+    from database import connect_to_mongo, close_mongo_connection, ensure_indexes, get_database
+    from cache import init_cache, close_cache
+    from routes.attendance import get_employee_names
+    timings["import_ms"] = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    await connect_to_mongo()
+    await ensure_indexes(apply=run_index_migrations)
+    init_cache()
+    timings["lifespan_startup_ms"] = (time.perf_counter() - start) * 1000
+
+    db = get_database()
+    start = time.perf_counter()
+    await db.command("ping")
+    timings["first_query_ms"] = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    await get_employee_names(db)
+    timings["employee_names_first_ms"] = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    await get_employee_names(db)
+    timings["employee_names_cached_ms"] = (time.perf_counter() - start) * 1000
+
+    await close_cache()
+    await close_mongo_connection()
+    return timings
+
+
+async def reset_database(database: str, seed: int) -> None:
+    """Drop indexes and the migration marker so the next boot migrates from scratch"""
+    from database import MIGRATIONS_COLLECTION
+
+    client = AsyncIOMotorClient(get_settings().mongodb_uri)
+    db = client[database]
+    try:
+        await db[MIGRATIONS_COLLECTION].drop()
+        for collection in (db.employees, db.attendance):
+            await collection.drop_indexes()
+
+        # Seed data so index builds have work to do
+        existing = await db.employees.count_documents({})
+        if existing < seed:
+            now = datetime.utcnow()
+            await db.employees.insert_many([
+                {
+                    "employee_id": f"BENCH{i:06d}",
+                    "full_name": f"Bench Employee {i}",
+                    "email": f"bench{i}@example.com",
+                    "department": "Benchmark",
+                    "created_at": now
+                }
+                for i in range(existing, seed)
+            ])
+            await db.attendance.insert_many([
+                {
+                    "employee_id": f"BENCH{i:06d}",
+                    "date": f"2026-01-{day:02d}",
+                    "status": "Present",
+                    "marked_at": now
+                }
+                for i in range(existing, seed)
+                for day in range(1, 6)
+            ])
+    finally:
+        client.close()
+
+
+def run_workers(count: int, run_index_migrations: bool, database: str) -> list:
+    """Boot `count` worker processes concurrently and collect their timings"""
+    args = [sys.executable, "-m", "benchmarks.startup", "--single"]
+    if not run_index_migrations:
+        args.append("--no-migrations")
+    # Each benchmark process boots on its own, like a single uvicorn worker
+    env = {**os.environ, "DATABASE_NAME": database, "WEB_CONCURRENCY": "1"}
+
+    procs = [
+        subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, env=env)
+        for _ in range(count)
+    ]
+    results = []
+    for index, proc in enumerate(procs):
+        out, err = proc.communicate()
+        lines = out.strip().splitlines()
+        try:
+            if proc.returncode != 0:
+                raise ValueError(f"exit code {proc.returncode}")
+            # Timings are the last line; earlier lines are startup logs
+            results.append(json.loads(lines[-1]))
+        except (ValueError, IndexError) as exc:
+            print(f"❌ Worker {index} failed ({exc})", file=sys.stderr)
+            for line in (lines + err.strip().splitlines())[-10:]:
+                print(f"    {line}", file=sys.stderr)
+    return results
+
+
+def summarize(label: str, results: list) -> None:
+    """Print mean/max of each timing across workers"""
+    print(f"\n{label} ({len(results)} workers)")
+    if not results:
+        print("  no worker completed")
+        return
+    for key in results[0]:
+        values = [r[key] for r in results]
+        print(f"  {key:<28} mean {sum(values) / len(values):8.1f}   max {max(values):8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HRMS Lite startup benchmark")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent workers to boot")
+    parser.add_argument(
+        "--database",
+        default="hrms_lite_bench",
+        help="Scratch database to benchmark against (its indexes are dropped)"
+    )
+    parser.add_argument("--seed", type=int, default=10000, help="Employees to seed in the scratch database")
+    parser.add_argument("--single", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--no-migrations", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single:
+        timings = asyncio.run(cold_start(not args.no_migrations))
+        print(json.dumps(timings))
+        return
+
+    if args.database == get_settings().database_name:
+        parser.error("--database must be a scratch database, not the application database")
+
+    asyncio.run(reset_database(args.database, args.seed))
+    summarize("Cold workers migrating concurrently", run_workers(args.workers, True, args.database))
+    summarize("Workers with indexes current", run_workers(args.workers, True, args.database))
+    summarize(
+        "Workers after prestart (RUN_INDEX_MIGRATIONS=false)",
+        run_workers(args.workers, False, args.database)
+    )
+
+
+if __name__ == "__main__":
+    main()
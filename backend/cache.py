@@ -0,0 +1,179 @@
+"""
+Shared cache layer
+Uses Redis (or any Redis-compatible server) when CACHE_URL is set so all
+workers share one copy; otherwise falls back to an in-process TTL cache,
+which is only allowed for single-worker deployments.
+
+Every key has a generation that invalidation bumps. Fills record the
+generation read before querying, and entries written under an older
+generation are ignored, so a fill racing with a write cannot restore
+stale data.
+
+The cache is best effort: backend errors are logged and treated as misses,
+and TTLs bound how stale an entry can get if an invalidation is lost.
+"""
+import json
+import time
+from typing import Any, Optional
+
+from config import get_settings
+
+try:
+    import redis.asyncio as aioredis
+    from redis.exceptions import RedisError
+except ImportError:  # redis is optional, only needed with CACHE_URL
+    aioredis = None
+    RedisError = OSError
+
+# Errors that make a cache operation a no-op rather than a failed request
+CACHE_ERRORS = (RedisError, OSError)
+
+# Cache keys used by the routers
+EMPLOYEE_NAMES_KEY = "employee_names"
+STATS_KEY = "stats"
+
+
+class LocalCache:
+    """In-process TTL cache (one copy per worker)"""
+
+    def __init__(self):
+        self._store: dict = {}
+        self._generations: dict = {}
+
+    async def generation(self, key: str) -> Optional[int]:
+        return self._generations.get(key, 0)
+
+    async def get(self, key: str) -> Optional[Any]:
+        entry = self._store.get(key)
+        if entry is None:
+            return None
+        expires_at, generation, value = entry
+        if expires_at < time.monotonic() or generation != self._generations.get(key, 0):
+            self._store.pop(key, None)
+            return None
+        return value
+
+    async def set(self, key: str, value: Any, ttl: int, generation: Optional[int]) -> None:
+        if generation != self._generations.get(key, 0):
+            # Invalidated while the value was being computed
+            return
+        self._store[key] = (time.monotonic() + ttl, generation, value)
+
+    async def invalidate(self, *keys: str) -> None:
+        for key in keys:
+            self._generations[key] = self._generations.get(key, 0) + 1
+            self._store.pop(key, None)
+
+    async def close(self) -> None:
+        self._store.clear()
+
+
+class RedisCache:
+    """Redis-backed cache shared by every worker"""
+
+    def __init__(self, url: str, prefix: str):
+        self._redis = aioredis.from_url(url)
+        self._prefix = prefix
+
+    def _key(self, key: str) -> str:
+        return f"{self._prefix}:{key}"
+
+    def _generation_key(self, key: str) -> str:
+        return f"{self._prefix}:{key}:generation"
+
+    async def generation(self, key: str) -> Optional[int]:
+        """Current generation, or None if Redis is unavailable"""
+        try:
+            raw = await self._redis.get(self._generation_key(key))
+        except CACHE_ERRORS as exc:
+            print(f"⚠️ Cache read failed: {exc!r}")
+            return None
+        return int(raw) if raw is not None else 0
+
+    async def get(self, key: str) -> Optional[Any]:
+        try:
+            raw, generation = await self._redis.mget(self._key(key), self._generation_key(key))
+        except CACHE_ERRORS as exc:
+            print(f"⚠️ Cache read failed: {exc!r}")
+            return None
+        if raw is None:
+            return None
+        entry = json.loads(raw)
+        if entry["generation"] != (int(generation) if generation is not None else 0):
+            return None
+        return entry["value"]
+
+    async def set(self, key: str, value: Any, ttl: int, generation: Optional[int]) -> None:
+        if generation is None:
+            # Generation unknown, so the entry could not be validated on read
+            return
+        # Readers compare the stored generation, so a late stale write is harmless
+        entry = json.dumps({"generation": generation, "value": value})
+        try:
+            await self._redis.set(self._key(key), entry, ex=ttl)
+        except CACHE_ERRORS as exc:
+            print(f"⚠️ Cache write failed: {exc!r}")
+
+    async def invalidate(self, *keys: str) -> None:
+        if not keys:
+            return
+        try:
+            async with self._redis.pipeline(transaction=False) as pipe:
+                for key in keys:
+                    pipe.incr(self._generation_key(key))
+                pipe.delete(*(self._key(key) for key in keys))
+                await pipe.execute()
+        except CACHE_ERRORS as exc:
+            # The write already committed; entries expire within their TTL
+            print(f"⚠️ Cache invalidation failed: {exc!r}")
+
+    async def close(self) -> None:
+        await self._redis.aclose()
+
+
+_cache = None
+
+
+def init_cache():
+    """Create the cache backend from settings"""
+    global _cache
+    settings = get_settings()
+
+    if settings.cache_url:
+        if aioredis is None:
+            raise RuntimeError("CACHE_URL is set but the redis package is not installed")
+        _cache = RedisCache(settings.cache_url, settings.cache_prefix)
+        print("✅ Using shared Redis cache")
+    elif settings.web_concurrency > 1:
+        # Per-worker caches would serve stale data after writes on other workers
+        raise RuntimeError(
+            f"Running {settings.web_concurrency} workers requires a shared cache; set CACHE_URL"
+        )
+    else:
+        _cache = LocalCache()
+    return _cache
+
+
+async def close_cache():
+    """Close the cache backend"""
+    global _cache
+    if _cache:
+        await _cache.close()
+        _cache = None
+
+
+def get_cache():
+    """Get cache instance, creating it on first use"""
+    if _cache is None:
+        return init_cache()
+    return _cache
+
+
+async def invalidate_employee_cache():
+    """Drop cached values derived from the employees collection"""
+    await get_cache().invalidate(EMPLOYEE_NAMES_KEY, STATS_KEY)
+
+
+async def invalidate_attendance_cache():
+    """Drop cached values derived from the attendance collection"""
+    await get_cache().invalidate(STATS_KEY)
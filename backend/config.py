@@ -0,0 +1,95 @@
+"""
+Application settings
+Loaded from environment variables (and .env) via pydantic-settings
+"""
+from functools import lru_cache
+from typing import Dict, Optional
+from pydantic import BaseModel, Field, model_validator
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class RouteLimit(BaseModel):
+    """Admission limits for one route (per worker process)"""
+    # Max requests handled at once; None disables the concurrency limit
+    concurrency: Optional[int] = None
+    # Requests allowed to wait for a slot before new ones get 503
+    queue_size: int = 0
+    # Seconds a queued request waits for a slot before getting 503
+    queue_timeout: float = 2.0
+    # Token bucket refill rate (requests/second); None disables rate limiting
+    rate: Optional[float] = None
+    # Token bucket capacity; defaults to `rate`
+    burst: Optional[int] = None
+
+
+# Heavy read paths are bounded so they cannot starve cheap writes such as
+# POST /api/attendance, which is deliberately left unlimited.
+DEFAULT_ROUTE_LIMITS = {
+    "GET /api/attendance": RouteLimit(concurrency=4, queue_size=16, queue_timeout=2.0, rate=20, burst=40),
+    "GET /api/attendance/employee/*": RouteLimit(concurrency=8, queue_size=32, queue_timeout=2.0),
+    "GET /api/attendance/summary/*": RouteLimit(concurrency=8, queue_size=32, queue_timeout=2.0),
+    "GET /api/employees": RouteLimit(concurrency=8, queue_size=32, queue_timeout=2.0),
+    "GET /api/stats": RouteLimit(concurrency=4, queue_size=16, queue_timeout=2.0, rate=20, burst=40),
+}
+
+
+class Settings(BaseSettings):
+    """Runtime configuration for the API and its workers"""
+    model_config = SettingsConfigDict(env_file=".env", extra="ignore")
+
+    # MongoDB
+    mongodb_uri: str = "mongodb://localhost:27017"
+    database_name: str = "hrms_lite"
+
+    # Index migrations
+    # Set to False on workers when indexes are applied by `python prestart.py`
+    run_index_migrations: bool = True
+    index_lock_ttl_seconds: int = 120
+    # How long a worker waits for migrations (with no process holding the
+    # migration lock) before refusing to start
+    index_migration_wait_seconds: int = 300
+
+    # Worker count; uvicorn and gunicorn both read WEB_CONCURRENCY
+    web_concurrency: int = 1
+
+    # Shared cache
+    # redis://... to share the cache across workers; unset keeps a per-process
+    # cache, which is only allowed when WEB_CONCURRENCY is 1
+    cache_url: Optional[str] = None
+    cache_prefix: str = "hrms"
+    employee_names_cache_ttl: int = 60
+    stats_cache_ttl: int = 30
+
+    # Admission control
+    # ROUTE_LIMITS is JSON keyed by "METHOD /path" (fnmatch patterns allowed)
+    admission_control_enabled: bool = True
+    route_limits: Dict[str, RouteLimit] = DEFAULT_ROUTE_LIMITS
+
+    # Soft delete
+    # Tombstoned employees and their attendance are purged after the retention period
+    tombstone_retention_days: int = 30
+    purge_enabled: bool = True
+    purge_interval_seconds: int = 900
+    # Off-peak window (UTC hours, end exclusive; may wrap past midnight).
+    # 0 -> 24 purges around the clock.
+    purge_window_start_hour: int = Field(1, ge=0, le=23)
+    purge_window_end_hour: int = Field(5, ge=0, le=24)
+    purge_batch_size: int = 50
+    purge_attendance_batch_size: int = 500
+    # Attendance batches deleted per pass; the rest waits for the next pass
+    purge_attendance_batches_per_pass: int = 20
+    purge_batch_pause_seconds: float = 0.5
+    purge_lock_ttl_seconds: int = 600
+
+    @model_validator(mode="after")
+    def check_purge_window(self) -> "Settings":
+        # Equal hours would make an empty window and purging would never run
+        if self.purge_window_start_hour == self.purge_window_end_hour:
+            raise ValueError("PURGE_WINDOW_START_HOUR and PURGE_WINDOW_END_HOUR must differ")
+        return self
+
+
+@lru_cache
+def get_settings() -> Settings:
+    """Get cached settings instance"""
+    return Settings()
@@ -2,12 +2,46 @@
 Database connection and configuration
 Uses Motor for async MongoDB operations
 """
+import asyncio
 import os
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Optional
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import DuplicateKeyError, OperationFailure
 from dotenv import load_dotenv
 
+from config import get_settings
+
 load_dotenv()
 
+MIGRATIONS_COLLECTION = "_migrations"
+INDEX_STATE_ID = "indexes"
+INDEX_LOCK_ID = "indexes_lock"
+
+# MongoDB error code for dropping an index that does not exist
+INDEX_NOT_FOUND = 27
+
+# Soft-deleted employees keep a `deleted_at` timestamp; active ones store null.
+# Queries on active employees must include this filter so the partial indexes apply.
+ACTIVE_EMPLOYEE_FILTER = {"deleted_at": {"$type": "null"}}
+DELETED_EMPLOYEE_FILTER = {"deleted_at": {"$type": "date"}}
+
+# Attendance of a soft-deleted employee is flagged with the same deleted_at
+ACTIVE_ATTENDANCE_FILTER = {"deleted_at": {"$type": "null"}}
+DELETED_ATTENDANCE_FILTER = {"deleted_at": {"$type": "date"}}
+
+# Documents written by pre-soft-delete code (e.g. old workers during a rolling
+# restart) lack deleted_at and match neither filter until backfilled
+MISSING_DELETED_AT_FILTER = {"deleted_at": {"$exists": False}}
+
+# Indexes replaced by partial (active-only) versions in migration 4
+LEGACY_EMPLOYEE_INDEXES = ("employee_id_1", "email_1", "employee_id_1_full_name_1")
+# Replaced by an active-only version in migration 6
+LEGACY_ATTENDANCE_INDEXES = ("employee_id_1_date_1",)
+
 # MongoDB client instance
 _client: AsyncIOMotorClient = None
 _database = None
@@ -16,21 +50,282 @@ _database = None
 async def connect_to_mongo():
     """Initialize MongoDB connection"""
     global _client, _database
-    
-    mongodb_uri = os.getenv("MONGODB_URI", "mongodb://localhost:27017")
-    
-    _client = AsyncIOMotorClient(mongodb_uri)
-    # Explicitly use 'hrms_lite' database instead of relying on URI
-    _database = _client["hrms_lite"]
-    
-    # Create indexes for better query performance
-    await _database.employees.create_index("employee_id", unique=True)
-    await _database.employees.create_index("email", unique=True)
-    await _database.attendance.create_index([("employee_id", 1), ("date", 1)], unique=True)
-    
+    settings = get_settings()
+
+    # Motor connects lazily, so this does no network I/O until the first query
+    _client = AsyncIOMotorClient(settings.mongodb_uri)
+    # Explicitly select the database (default 'hrms_lite') instead of relying on URI
+    _database = _client[settings.database_name]
+
     print("✅ Connected to MongoDB")
 
 
+async def _drop_index_if_exists(collection, name: str):
+    """Drop an index, treating one that is already gone as success"""
+    try:
+        await collection.drop_index(name)
+    except OperationFailure as exc:
+        if exc.code != INDEX_NOT_FOUND:
+            raise
+
+
+async def backfill_deleted_at(collection) -> int:
+    """
+    Give documents missing deleted_at an explicit null so they count as active.
+    A document that would duplicate an active one's unique key (possible for
+    writes that bypassed the partial unique indexes) is tombstoned instead.
+    Returns the number of documents fixed.
+    """
+    try:
+        result = await collection.update_many(
+            MISSING_DELETED_AT_FILTER,
+            {"$set": {"deleted_at": None}}
+        )
+        return result.modified_count
+    except DuplicateKeyError:
+        pass
+
+    fixed = 0
+    async for document in collection.find(MISSING_DELETED_AT_FILTER, {"_id": 1}):
+        query = {"_id": document["_id"], **MISSING_DELETED_AT_FILTER}
+        try:
+            await collection.update_one(query, {"$set": {"deleted_at": None}})
+        except DuplicateKeyError:
+            await collection.update_one(query, {"$set": {"deleted_at": datetime.utcnow()}})
+            print(f"⚠️ Tombstoned duplicate {collection.name} document {document['_id']}")
+        fixed += 1
+    return fixed
+
+
+async def _migrate_base_indexes(db):
+    """Unique lookup indexes"""
+    await db.employees.create_index("employee_id", unique=True)
+    await db.employees.create_index("email", unique=True)
+    await db.attendance.create_index([("employee_id", 1), ("date", 1)], unique=True)
+
+
+async def _migrate_employee_name_index(db):
+    """Serves employee name lookups and the employee-name map"""
+    await db.employees.create_index([("employee_id", 1), ("full_name", 1)])
+
+
+async def _backfill_deleted_at(db):
+    """Store deleted_at: null so active employees match ACTIVE_EMPLOYEE_FILTER"""
+    await backfill_deleted_at(db.employees)
+
+
+async def _migrate_partial_indexes(db):
+    """
+    Replace the employee indexes with versions over active employees only,
+    so tombstones don't block reuse of an employee_id or email.
+    The partial indexes are built before the legacy ones are dropped, so
+    uniqueness is enforced throughout (MongoDB 5.0+ allows both to coexist).
+    """
+    await db.employees.create_index(
+        "employee_id",
+        name="employee_id_active",
+        unique=True,
+        partialFilterExpression=ACTIVE_EMPLOYEE_FILTER
+    )
+    await db.employees.create_index(
+        "email",
+        name="email_active",
+        unique=True,
+        partialFilterExpression=ACTIVE_EMPLOYEE_FILTER
+    )
+    await db.employees.create_index(
+        [("employee_id", 1), ("full_name", 1)],
+        name="employee_id_full_name_active",
+        partialFilterExpression=ACTIVE_EMPLOYEE_FILTER
+    )
+    # Finds tombstones for the purge job
+    await db.employees.create_index(
+        "deleted_at",
+        name="deleted_at_tombstones",
+        partialFilterExpression=DELETED_EMPLOYEE_FILTER
+    )
+
+    # Catch employees inserted without deleted_at since the backfill
+    await _backfill_deleted_at(db)
+
+    for name in LEGACY_EMPLOYEE_INDEXES:
+        await _drop_index_if_exists(db.employees, name)
+
+
+async def _backfill_attendance_deleted_at(db):
+    """Store deleted_at: null so active attendance matches ACTIVE_ATTENDANCE_FILTER"""
+    await backfill_deleted_at(db.attendance)
+
+
+async def _migrate_attendance_partial_indexes(db):
+    """
+    Index active attendance separately from records of deleted employees,
+    so a reused employee_id can mark the dates its predecessor had.
+    """
+    await db.attendance.create_index(
+        [("employee_id", 1), ("date", 1)],
+        name="employee_id_date_active",
+        unique=True,
+        partialFilterExpression=ACTIVE_ATTENDANCE_FILTER
+    )
+    # Finds flagged records for the purge job
+    await db.attendance.create_index(
+        "deleted_at",
+        name="deleted_at_tombstones",
+        partialFilterExpression=DELETED_ATTENDANCE_FILTER
+    )
+
+    await _backfill_attendance_deleted_at(db)
+
+    for name in LEGACY_ATTENDANCE_INDEXES:
+        await _drop_index_if_exists(db.attendance, name)
+
+
+# Ordered (version, step) pairs; append new steps, never renumber
+MIGRATIONS = [
+    (1, _migrate_base_indexes),
+    (2, _migrate_employee_name_index),
+    (3, _backfill_deleted_at),
+    (4, _migrate_partial_indexes),
+    (5, _backfill_attendance_deleted_at),
+    (6, _migrate_attendance_partial_indexes),
+]
+INDEX_VERSION = MIGRATIONS[-1][0]
+
+
+async def acquire_lock(db, lock_id: str, ttl_seconds: int) -> Optional[str]:
+    """
+    Take a named lock unless another process holds an unexpired one.
+    Returns an owner token to pass to `release_lock`, or None if not acquired.
+    """
+    now = datetime.utcnow()
+    owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex}"
+    try:
+        await db[MIGRATIONS_COLLECTION].find_one_and_update(
+            {"_id": lock_id, "expires_at": {"$lt": now}},
+            {"$set": {
+                "owner": owner,
+                "expires_at": now + timedelta(seconds=ttl_seconds)
+            }},
+            upsert=True
+        )
+    except DuplicateKeyError:
+        # Lock document exists and has not expired
+        return None
+    return owner
+
+
+async def release_lock(db, lock_id: str, owner: str):
+    """Release a named lock if it is still held by `owner`"""
+    # An expired holder must not delete a lock another process has since taken
+    await db[MIGRATIONS_COLLECTION].delete_one({"_id": lock_id, "owner": owner})
+
+
+async def renew_lock(db, lock_id: str, owner: str, ttl_seconds: int) -> bool:
+    """Extend a lock held by `owner`; returns False if it has been lost"""
+    result = await db[MIGRATIONS_COLLECTION].update_one(
+        {"_id": lock_id, "owner": owner},
+        {"$set": {"expires_at": datetime.utcnow() + timedelta(seconds=ttl_seconds)}}
+    )
+    return result.matched_count == 1
+
+
+async def keep_lock_alive(db, lock_id: str, owner: str, ttl_seconds: int):
+    """Heartbeat task renewing a lock for as long as its holder is working"""
+    while True:
+        await asyncio.sleep(ttl_seconds / 3)
+        try:
+            if not await renew_lock(db, lock_id, owner, ttl_seconds):
+                print(f"⚠️ Lost lock '{lock_id}'")
+                return
+        except Exception as exc:
+            # Keep trying; the lock only lapses after a full TTL without renewal
+            print(f"⚠️ Failed to renew lock '{lock_id}': {exc!r}")
+
+
+async def _lock_is_held(db, lock_id: str) -> bool:
+    """Whether another process holds an unexpired lock"""
+    lock = await db[MIGRATIONS_COLLECTION].find_one(
+        {"_id": lock_id, "expires_at": {"$gte": datetime.utcnow()}},
+        {"_id": 1}
+    )
+    return lock is not None
+
+
+async def _applied_version(db) -> int:
+    """Last migration version recorded in the database"""
+    state = await db[MIGRATIONS_COLLECTION].find_one({"_id": INDEX_STATE_ID}, {"version": 1})
+    return state.get("version", 0) if state else 0
+
+
+async def _apply_migrations(db):
+    """Run pending migration steps in order, recording each one"""
+    version = await _applied_version(db)
+    for step_version, step in MIGRATIONS:
+        if step_version <= version:
+            continue
+        await step(db)
+        await db[MIGRATIONS_COLLECTION].update_one(
+            {"_id": INDEX_STATE_ID},
+            {"$set": {"version": step_version, "applied_at": datetime.utcnow()}},
+            upsert=True
+        )
+        print(f"✅ Applied index migration {step_version} ({step.__name__})")
+
+
+async def ensure_indexes(apply: bool = True) -> bool:
+    """
+    Make sure index migrations are current before serving requests.
+    With `apply`, one process (under a lock) runs pending migrations while the
+    others wait for the version marker; without it, only wait for the marker
+    (written by `python prestart.py`). The lock holder renews it while the
+    migrations run, and waiters keep waiting as long as it is held. Raises
+    RuntimeError if the migrations are not current and nobody has been
+    applying them for `index_migration_wait_seconds`.
+    Returns True if this process applied migrations.
+    """
+    settings = get_settings()
+    db = _database
+    deadline = time.monotonic() + settings.index_migration_wait_seconds
+    waiting = False
+
+    while True:
+        # Cheap check so already-migrated deployments skip create_index entirely
+        version = await _applied_version(db)
+        if version >= INDEX_VERSION:
+            if waiting:
+                print("✅ Index migrations are current")
+            return False
+
+        if apply:
+            owner = await acquire_lock(db, INDEX_LOCK_ID, settings.index_lock_ttl_seconds)
+            if owner:
+                heartbeat = asyncio.create_task(
+                    keep_lock_alive(db, INDEX_LOCK_ID, owner, settings.index_lock_ttl_seconds)
+                )
+                try:
+                    await _apply_migrations(db)
+                finally:
+                    heartbeat.cancel()
+                    await release_lock(db, INDEX_LOCK_ID, owner)
+                return True
+
+        if await _lock_is_held(db, INDEX_LOCK_ID):
+            # Another process is actively migrating; long builds are fine
+            deadline = time.monotonic() + settings.index_migration_wait_seconds
+        elif time.monotonic() > deadline:
+            if apply:
+                raise RuntimeError("Timed out waiting for index migrations in another process")
+            raise RuntimeError(
+                f"Database is at index version {version}, expected {INDEX_VERSION}; "
+                "run `python prestart.py`"
+            )
+        if not waiting:
+            print(f"⏳ Waiting for index migrations (version {version} of {INDEX_VERSION})")
+            waiting = True
+        await asyncio.sleep(1)
+
+
 async def close_mongo_connection():
     """Close MongoDB connection"""
     global _client
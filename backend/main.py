@@ -6,7 +6,18 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 
-from database import connect_to_mongo, close_mongo_connection, get_database
+from database import (
+    connect_to_mongo,
+    close_mongo_connection,
+    ensure_indexes,
+    get_database,
+    ACTIVE_EMPLOYEE_FILTER,
+    ACTIVE_ATTENDANCE_FILTER
+)
+from cache import init_cache, close_cache, get_cache, STATS_KEY
+from config import get_settings
+from admission import AdmissionControlMiddleware, get_admission_metrics
+from purge import start_purge_task, stop_purge_task
 from routes import employees, attendance
 
 
@@ -15,8 +26,14 @@ async def lifespan(app: FastAPI):
     """Application lifespan events"""
     # Startup
     await connect_to_mongo()
+    # Apply pending index migrations, or wait for the process applying them
+    await ensure_indexes(apply=get_settings().run_index_migrations)
+    init_cache()
+    purge_task = start_purge_task()
     yield
     # Shutdown
+    await stop_purge_task(purge_task)
+    await close_cache()
     await close_mongo_connection()
 
 
@@ -27,6 +44,11 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# Admission control - per-route concurrency and rate limits
+# Registered before CORS so rejected requests still get CORS headers
+if get_settings().admission_control_enabled:
+    app.add_middleware(AdmissionControlMiddleware)
+
 # CORS Configuration - Allow frontend origins
 app.add_middleware(
     CORSMiddleware,
@@ -58,16 +80,32 @@ async def root():
 @app.get("/api/stats", tags=["Dashboard"])
 async def get_stats():
     """Get dashboard statistics"""
+    cache = get_cache()
+    cached = await cache.get(STATS_KEY)
+    if cached is not None:
+        return cached
+    generation = await cache.generation(STATS_KEY)
+    
     db = get_database()
     
-    total_employees = await db.employees.count_documents({})
-    total_attendance = await db.attendance.count_documents({})
-    present_count = await db.attendance.count_documents({"status": "Present"})
-    absent_count = await db.attendance.count_documents({"status": "Absent"})
+    # Exclude deleted employees and their not-yet-purged attendance
+    total_employees = await db.employees.count_documents(ACTIVE_EMPLOYEE_FILTER)
+    total_attendance = await db.attendance.count_documents(ACTIVE_ATTENDANCE_FILTER)
+    present_count = await db.attendance.count_documents({**ACTIVE_ATTENDANCE_FILTER, "status": "Present"})
+    absent_count = await db.attendance.count_documents({**ACTIVE_ATTENDANCE_FILTER, "status": "Absent"})
     
-    return {
+    stats = {
         "total_employees": total_employees,
         "total_attendance_records": total_attendance,
         "present_count": present_count,
         "absent_count": absent_count
     }
+    await cache.set(STATS_KEY, stats, get_settings().stats_cache_ttl, generation)
+    
+    return stats
+
+
+@app.get("/api/metrics/admission", tags=["Health"])
+async def admission_metrics():
+    """Per-route queue depth and rejection counts for this worker"""
+    return get_admission_metrics()
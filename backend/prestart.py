@@ -0,0 +1,28 @@
+"""
+Pre-start step for multi-worker deployments
+Applies index migrations once before the API workers boot:
+
+    python prestart.py && RUN_INDEX_MIGRATIONS=false WEB_CONCURRENCY=4 \
+        CACHE_URL=redis://localhost:6379/0 uvicorn main:app
+
+Multiple workers need the shared cache (CACHE_URL); set the worker count via
+WEB_CONCURRENCY rather than --workers so startup can enforce that.
+"""
+import asyncio
+
+from database import connect_to_mongo, close_mongo_connection, ensure_indexes
+
+
+async def main():
+    """Connect, apply index migrations, disconnect"""
+    await connect_to_mongo()
+    try:
+        applied = await ensure_indexes()
+        if not applied:
+            print("✅ Indexes already up to date")
+    finally:
+        await close_mongo_connection()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,50 @@
+"""
+Query projection helpers
+Builds MongoDB projections and sparse responses for the `fields=` parameter
+"""
+from typing import Iterable, List, Optional
+from fastapi import HTTPException, status
+
+
+def parse_fields(fields: Optional[str], allowed: Iterable[str]) -> Optional[List[str]]:
+    """
+    Parse a comma-separated `fields` query value.
+    Returns None when no fields were requested (full response).
+    """
+    if not fields:
+        return None
+
+    allowed = list(allowed)
+    requested = []
+    for field in fields.split(","):
+        field = field.strip()
+        if field and field not in requested:
+            requested.append(field)
+
+    unknown = [field for field in requested if field not in allowed]
+    if unknown or not requested:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid fields: {', '.join(unknown) or fields}. Allowed: {', '.join(allowed)}"
+        )
+    return requested
+
+
+def build_projection(fields: List[str], derived: Iterable[str] = ()) -> dict:
+    """MongoDB projection for the requested response fields (`id` maps to `_id`)"""
+    projection = {"_id": 1 if "id" in fields else 0}
+    for field in fields:
+        if field != "id" and field not in derived:
+            projection[field] = 1
+    return projection
+
+
+def sparse_response(document: dict, fields: List[str]) -> dict:
+    """Convert a projected MongoDB document to a sparse response"""
+    response = {}
+    for field in fields:
+        if field == "id":
+            response["id"] = str(document["_id"])
+        else:
+            response[field] = document.get(field)
+    return response
@@ -0,0 +1,198 @@
+"""
+Tombstone purge
+Removes soft-deleted employees and their attendance after the retention
+period, in small batches during the configured off-peak window.
+"""
+import asyncio
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+
+from config import get_settings
+from cache import invalidate_attendance_cache
+from database import (
+    acquire_lock,
+    release_lock,
+    backfill_deleted_at,
+    get_database,
+    ACTIVE_EMPLOYEE_FILTER,
+    ACTIVE_ATTENDANCE_FILTER
+)
+
+PURGE_LOCK_ID = "purge_lock"
+
+# Fraction of the purge lock TTL a pass may use before stopping early
+PURGE_LOCK_BUDGET = 0.8
+
+# Delay before re-checking orphaned attendance, so an employee_id rename
+# (employee updated first, attendance second) isn't mistaken for a delete
+ORPHAN_RECHECK_SECONDS = 5
+
+
+def in_purge_window(now: datetime) -> bool:
+    """Whether `now` (UTC) falls inside the off-peak purge window"""
+    settings = get_settings()
+    start, end = settings.purge_window_start_hour, settings.purge_window_end_hour
+    if start <= end:
+        return start <= now.hour < end
+    # Window wraps past midnight, e.g. 22 -> 4
+    return now.hour >= start or now.hour < end
+
+
+async def _purge_expired_attendance(
+    db,
+    cutoff: datetime,
+    should_continue: Optional[Callable[[], bool]] = None
+) -> int:
+    """
+    Delete flagged attendance older than `cutoff` in rate-limited batches,
+    at most `purge_attendance_batches_per_pass` batches per call.
+    """
+    settings = get_settings()
+    deleted = 0
+    for _ in range(settings.purge_attendance_batches_per_pass):
+        if should_continue is not None and not should_continue():
+            break
+        cursor = db.attendance.find(
+            {"deleted_at": {"$type": "date", "$lt": cutoff}},
+            {"_id": 1}
+        ).limit(settings.purge_attendance_batch_size)
+        ids = [record["_id"] async for record in cursor]
+        if not ids:
+            break
+        result = await db.attendance.delete_many({"_id": {"$in": ids}})
+        deleted += result.deleted_count
+        await asyncio.sleep(settings.purge_batch_pause_seconds)
+    return deleted
+
+
+async def backfill_stragglers(db) -> int:
+    """Backfill deleted_at on documents written without it since the migrations"""
+    fixed = await backfill_deleted_at(db.employees)
+    fixed += await backfill_deleted_at(db.attendance)
+    if fixed:
+        print(f"🧹 Backfilled deleted_at on {fixed} documents")
+    return fixed
+
+
+async def _orphaned_attendance_ids(db) -> set:
+    """employee_ids with active attendance but no active employee"""
+    attendance_ids = await db.attendance.distinct("employee_id", ACTIVE_ATTENDANCE_FILTER)
+    employee_ids = await db.employees.distinct("employee_id", ACTIVE_EMPLOYEE_FILTER)
+    return set(attendance_ids) - set(employee_ids)
+
+
+async def flag_orphaned_attendance(db) -> int:
+    """
+    Flag active attendance whose employee is gone, e.g. marked while the
+    employee was being deleted, or left behind by a delete that failed
+    between its two writes. Only IDs orphaned on two checks are flagged.
+    Returns the number of records flagged.
+    """
+    orphaned = await _orphaned_attendance_ids(db)
+    if not orphaned:
+        return 0
+    await asyncio.sleep(ORPHAN_RECHECK_SECONDS)
+    orphaned &= await _orphaned_attendance_ids(db)
+    if not orphaned:
+        return 0
+
+    result = await db.attendance.update_many(
+        {"employee_id": {"$in": list(orphaned)}, **ACTIVE_ATTENDANCE_FILTER},
+        {"$set": {"deleted_at": datetime.utcnow()}}
+    )
+    if result.modified_count:
+        await invalidate_attendance_cache()
+        print(f"🧹 Flagged {result.modified_count} orphaned attendance records")
+    return result.modified_count
+
+
+async def purge_expired_tombstones(
+    db,
+    now: Optional[datetime] = None,
+    should_continue: Optional[Callable[[], bool]] = None
+) -> int:
+    """
+    Purge attendance flagged before the retention cutoff, then one batch
+    of expired employee tombstones. Stops early once `should_continue`
+    returns False; remaining work is picked up by the next pass.
+    Returns the number of employees purged.
+    """
+    settings = get_settings()
+    now = now or datetime.utcnow()
+    cutoff = now - timedelta(days=settings.tombstone_retention_days)
+
+    await _purge_expired_attendance(db, cutoff, should_continue)
+    if should_continue is not None and not should_continue():
+        return 0
+
+    cursor = db.employees.find(
+        {"deleted_at": {"$type": "date", "$lt": cutoff}},
+        {"_id": 1}
+    ).sort("deleted_at", 1).limit(settings.purge_batch_size)
+    ids = [tombstone["_id"] async for tombstone in cursor]
+    if not ids:
+        return 0
+
+    result = await db.employees.delete_many({"_id": {"$in": ids}})
+    return result.deleted_count
+
+
+async def run_purge_loop():
+    """Background task: purge expired tombstones during the off-peak window"""
+    settings = get_settings()
+    while True:
+        await asyncio.sleep(settings.purge_interval_seconds)
+        if not in_purge_window(datetime.utcnow()):
+            continue
+
+        # Errors (including lock handling) are logged so the loop keeps running
+        try:
+            await _purge_once(get_database())
+        except Exception as exc:
+            print(f"⚠️ Tombstone purge failed: {exc!r}")
+
+
+async def _purge_once(db):
+    """Run one purge pass under the purge lock"""
+    settings = get_settings()
+    # Only one worker purges at a time
+    owner = await acquire_lock(db, PURGE_LOCK_ID, settings.purge_lock_ttl_seconds)
+    if not owner:
+        return
+
+    # Stop before the window closes or the lock expires under us
+    deadline = time.monotonic() + settings.purge_lock_ttl_seconds * PURGE_LOCK_BUDGET
+
+    def should_continue() -> bool:
+        return in_purge_window(datetime.utcnow()) and time.monotonic() < deadline
+
+    try:
+        await backfill_stragglers(db)
+        await flag_orphaned_attendance(db)
+        purged = await purge_expired_tombstones(db, should_continue=should_continue)
+        if purged:
+            print(f"🧹 Purged {purged} deleted employees")
+    finally:
+        await release_lock(db, PURGE_LOCK_ID, owner)
+
+
+def start_purge_task() -> Optional[asyncio.Task]:
+    """Start the background purge task if enabled"""
+    if not get_settings().purge_enabled:
+        return None
+    return asyncio.create_task(run_purge_loop())
+
+
+async def stop_purge_task(task: Optional[asyncio.Task]) -> None:
+    """Cancel the background purge task"""
+    if task is None:
+        return
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+    except Exception as exc:
+        # The task already died; don't let that fail application shutdown
+        print(f"⚠️ Tombstone purge task had stopped: {exc!r}")
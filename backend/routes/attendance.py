@@ -7,7 +7,10 @@ from typing import Optional
 from fastapi import APIRouter, HTTPException, status, Query
 from bson import ObjectId
 
-from database import get_database
+from database import get_database, ACTIVE_EMPLOYEE_FILTER, ACTIVE_ATTENDANCE_FILTER
+from cache import get_cache, invalidate_attendance_cache, EMPLOYEE_NAMES_KEY
+from config import get_settings
+from projection import parse_fields, build_projection, sparse_response
 from models.attendance import (
     AttendanceCreate,
     AttendanceResponse,
@@ -17,6 +20,21 @@ from models.attendance import (
 
 router = APIRouter()
 
+# Fields returned by the API; `id` is the MongoDB `_id`, `employee_name` is joined in
+ATTENDANCE_FIELDS = ("id", "employee_id", "date", "status", "marked_at", "employee_name")
+
+# Projection for full attendance responses
+ATTENDANCE_PROJECTION = {
+    "employee_id": 1,
+    "date": 1,
+    "status": 1,
+    "marked_at": 1
+}
+
+# Employee lookups only need the name. The {employee_id, full_name} index
+# narrows the scan, but the deleted_at filter still fetches each document.
+EMPLOYEE_NAME_PROJECTION = {"_id": 0, "employee_id": 1, "full_name": 1}
+
 
 def attendance_helper(record: dict, employee_name: str = None) -> dict:
     """Convert MongoDB document to response format"""
@@ -30,6 +48,26 @@ def attendance_helper(record: dict, employee_name: str = None) -> dict:
     }
 
 
+async def get_employee_names(db) -> dict:
+    """Get employee_id -> full_name map, served from the shared cache"""
+    cache = get_cache()
+    employees_map = await cache.get(EMPLOYEE_NAMES_KEY)
+    if employees_map is not None:
+        return employees_map
+    generation = await cache.generation(EMPLOYEE_NAMES_KEY)
+    
+    employees_map = {}
+    # Sorting on employee_id uses the active {employee_id, full_name} index order
+    cursor = db.employees.find(ACTIVE_EMPLOYEE_FILTER, EMPLOYEE_NAME_PROJECTION).sort("employee_id", 1)
+    async for emp in cursor:
+        employees_map[emp["employee_id"]] = emp["full_name"]
+    
+    await cache.set(
+        EMPLOYEE_NAMES_KEY, employees_map, get_settings().employee_names_cache_ttl, generation
+    )
+    return employees_map
+
+
 @router.post(
     "",
     response_model=AttendanceResponse,
@@ -51,7 +89,10 @@ async def mark_attendance(attendance: AttendanceCreate):
     db = get_database()
     
     # Verify employee exists
-    employee = await db.employees.find_one({"employee_id": attendance.employee_id})
+    employee = await db.employees.find_one(
+        {"employee_id": attendance.employee_id, **ACTIVE_EMPLOYEE_FILTER},
+        EMPLOYEE_NAME_PROJECTION
+    )
     if not employee:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -61,8 +102,9 @@ async def mark_attendance(attendance: AttendanceCreate):
     # Check if attendance already marked for this date
     existing = await db.attendance.find_one({
         "employee_id": attendance.employee_id,
-        "date": attendance.date.isoformat()
-    })
+        "date": attendance.date.isoformat(),
+        **ACTIVE_ATTENDANCE_FILTER
+    }, {"_id": 0, "employee_id": 1})
     
     if existing:
         raise HTTPException(
@@ -75,13 +117,34 @@ async def mark_attendance(attendance: AttendanceCreate):
         "employee_id": attendance.employee_id,
         "date": attendance.date.isoformat(),
         "status": attendance.status.value,
-        "marked_at": datetime.utcnow()
+        "marked_at": datetime.utcnow(),
+        "deleted_at": None
     }
     
     result = await db.attendance.insert_one(attendance_doc)
     
+    # The employee may have been deleted (or renamed) since the check above;
+    # flag the record so it is purged with the employee's other attendance
+    employee = await db.employees.find_one(
+        {"employee_id": attendance.employee_id, **ACTIVE_EMPLOYEE_FILTER},
+        EMPLOYEE_NAME_PROJECTION
+    )
+    if not employee:
+        await db.attendance.update_one(
+            {"_id": result.inserted_id, **ACTIVE_ATTENDANCE_FILTER},
+            {"$set": {"deleted_at": datetime.utcnow()}}
+        )
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Employee with ID '{attendance.employee_id}' not found"
+        )
+    
+    await invalidate_attendance_cache()
+    
     # Fetch and return created record
-    created_record = await db.attendance.find_one({"_id": result.inserted_id})
+    created_record = await db.attendance.find_one(
+        {"_id": result.inserted_id}, ATTENDANCE_PROJECTION
+    )
     return attendance_helper(created_record, employee["full_name"])
 
 
@@ -92,33 +155,55 @@ async def mark_attendance(attendance: AttendanceCreate):
 )
 async def get_all_attendance(
     date_filter: Optional[date] = Query(None, description="Filter by specific date"),
-    employee_id: Optional[str] = Query(None, description="Filter by employee ID")
+    employee_id: Optional[str] = Query(None, description="Filter by employee ID"),
+    fields: Optional[str] = Query(
+        None,
+        description="Comma-separated fields to return (e.g. employee_id,date,status)"
+    )
 ):
     """
     Retrieve attendance records with optional filters.
     - **date_filter**: Filter records by date
     - **employee_id**: Filter records by employee ID
+    - **fields**: Return only these fields for a sparse response
     """
     db = get_database()
     
-    # Build query
-    query = {}
+    # Build query (records of deleted employees are hidden until purged)
+    query = {**ACTIVE_ATTENDANCE_FILTER}
     if date_filter:
         query["date"] = date_filter.isoformat()
     if employee_id:
         query["employee_id"] = employee_id
     
-    # Get employee names for display
-    employees_map = {}
-    async for emp in db.employees.find():
-        employees_map[emp["employee_id"]] = emp["full_name"]
+    requested = parse_fields(fields, ATTENDANCE_FIELDS)
+    if requested:
+        projection = build_projection(requested, derived=("employee_name",))
+        if "employee_name" in requested:
+            # Needed to join the name even if not returned
+            projection["employee_id"] = 1
+    else:
+        projection = ATTENDANCE_PROJECTION
+    
+    # Get employee names for display (skipped for sparse responses without names)
+    employees_map = None
+    if not requested or "employee_name" in requested:
+        employees_map = await get_employee_names(db)
     
     records = []
-    cursor = db.attendance.find(query).sort("date", -1)
+    cursor = db.attendance.find(query, projection).sort("date", -1)
     
     async for record in cursor:
-        employee_name = employees_map.get(record["employee_id"], "Unknown")
-        records.append(attendance_helper(record, employee_name))
+        employee_name = None
+        if employees_map is not None:
+            employee_name = employees_map.get(record["employee_id"], "Unknown")
+        if requested:
+            response = sparse_response(record, requested)
+            if "employee_name" in requested:
+                response["employee_name"] = employee_name
+            records.append(response)
+        else:
+            records.append(attendance_helper(record, employee_name))
     
     return {
         "records": records,
@@ -141,7 +226,9 @@ async def get_employee_attendance(employee_id: str):
     db = get_database()
     
     # Verify employee exists
-    employee = await db.employees.find_one({"employee_id": employee_id})
+    employee = await db.employees.find_one(
+        {"employee_id": employee_id, **ACTIVE_EMPLOYEE_FILTER}, EMPLOYEE_NAME_PROJECTION
+    )
     if not employee:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -149,7 +236,9 @@ async def get_employee_attendance(employee_id: str):
         )
     
     records = []
-    cursor = db.attendance.find({"employee_id": employee_id}).sort("date", -1)
+    cursor = db.attendance.find(
+        {"employee_id": employee_id, **ACTIVE_ATTENDANCE_FILTER}, ATTENDANCE_PROJECTION
+    ).sort("date", -1)
     
     async for record in cursor:
         records.append(attendance_helper(record, employee["full_name"]))
@@ -175,7 +264,9 @@ async def get_attendance_summary(employee_id: str):
     db = get_database()
     
     # Verify employee exists
-    employee = await db.employees.find_one({"employee_id": employee_id})
+    employee = await db.employees.find_one(
+        {"employee_id": employee_id, **ACTIVE_EMPLOYEE_FILTER}, EMPLOYEE_NAME_PROJECTION
+    )
     if not employee:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -183,9 +274,12 @@ async def get_attendance_summary(employee_id: str):
         )
     
     # Calculate statistics
-    total_days = await db.attendance.count_documents({"employee_id": employee_id})
+    total_days = await db.attendance.count_documents(
+        {"employee_id": employee_id, **ACTIVE_ATTENDANCE_FILTER}
+    )
     present_days = await db.attendance.count_documents({
         "employee_id": employee_id,
+        **ACTIVE_ATTENDANCE_FILTER,
         "status": "Present"
     })
     absent_days = total_days - present_days
@@ -224,7 +318,7 @@ async def delete_attendance(attendance_id: str):
             detail="Invalid attendance ID format"
         )
     
-    result = await db.attendance.delete_one({"_id": obj_id})
+    result = await db.attendance.delete_one({"_id": obj_id, **ACTIVE_ATTENDANCE_FILTER})
     
     if result.deleted_count == 0:
         raise HTTPException(
@@ -232,4 +326,6 @@ async def delete_attendance(attendance_id: str):
             detail="Attendance record not found"
         )
     
+    await invalidate_attendance_cache()
+    
     return None
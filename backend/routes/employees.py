@@ -3,8 +3,11 @@ Employee API Routes
 CRUD operations for employee management
 """
 from datetime import datetime
-from fastapi import APIRouter, HTTPException, status
-from database import get_database
+from typing import Optional
+from fastapi import APIRouter, HTTPException, status, Query
+from database import get_database, ACTIVE_EMPLOYEE_FILTER, ACTIVE_ATTENDANCE_FILTER
+from cache import invalidate_employee_cache
+from projection import parse_fields, build_projection, sparse_response
 from models.employee import (
     EmployeeCreate,
     EmployeeResponse,
@@ -13,6 +16,21 @@ from models.employee import (
 
 router = APIRouter()
 
+# Fields returned by the API; `id` is the MongoDB `_id`
+EMPLOYEE_FIELDS = ("id", "employee_id", "full_name", "email", "department", "created_at")
+
+# Projection for full employee responses
+EMPLOYEE_PROJECTION = {
+    "employee_id": 1,
+    "full_name": 1,
+    "email": 1,
+    "department": 1,
+    "created_at": 1
+}
+
+# Projection for existence checks
+EXISTS_PROJECTION = {"_id": 1}
+
 
 def employee_helper(employee: dict) -> dict:
     """Convert MongoDB document to response format"""
@@ -47,7 +65,9 @@ async def create_employee(employee: EmployeeCreate):
     db = get_database()
     
     # Check for duplicate employee_id
-    existing_by_id = await db.employees.find_one({"employee_id": employee.employee_id})
+    existing_by_id = await db.employees.find_one(
+        {"employee_id": employee.employee_id, **ACTIVE_EMPLOYEE_FILTER}, EXISTS_PROJECTION
+    )
     if existing_by_id:
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
@@ -55,7 +75,9 @@ async def create_employee(employee: EmployeeCreate):
         )
     
     # Check for duplicate email
-    existing_by_email = await db.employees.find_one({"email": employee.email})
+    existing_by_email = await db.employees.find_one(
+        {"email": employee.email, **ACTIVE_EMPLOYEE_FILTER}, EXISTS_PROJECTION
+    )
     if existing_by_email:
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
@@ -65,13 +87,17 @@ async def create_employee(employee: EmployeeCreate):
     # Create employee document
     employee_doc = {
         **employee.model_dump(),
-        "created_at": datetime.utcnow()
+        "created_at": datetime.utcnow(),
+        "deleted_at": None
     }
     
     result = await db.employees.insert_one(employee_doc)
+    await invalidate_employee_cache()
     
     # Fetch and return created employee
-    created_employee = await db.employees.find_one({"_id": result.inserted_id})
+    created_employee = await db.employees.find_one(
+        {"_id": result.inserted_id}, EMPLOYEE_PROJECTION
+    )
     return employee_helper(created_employee)
 
 
@@ -80,18 +106,30 @@ async def create_employee(employee: EmployeeCreate):
     response_model=EmployeeListResponse,
     summary="Get all employees"
 )
-async def get_all_employees():
+async def get_all_employees(
+    fields: Optional[str] = Query(
+        None,
+        description="Comma-separated fields to return (e.g. employee_id,full_name)"
+    )
+):
     """
     Retrieve a list of all employees in the system.
     Returns employees sorted by creation date (newest first).
+    - **fields**: Return only these fields for a sparse response
     """
     db = get_database()
     
+    requested = parse_fields(fields, EMPLOYEE_FIELDS)
+    projection = build_projection(requested) if requested else EMPLOYEE_PROJECTION
+    
     employees = []
-    cursor = db.employees.find().sort("created_at", -1)
+    cursor = db.employees.find(ACTIVE_EMPLOYEE_FILTER, projection).sort("created_at", -1)
     
     async for employee in cursor:
-        employees.append(employee_helper(employee))
+        if requested:
+            employees.append(sparse_response(employee, requested))
+        else:
+            employees.append(employee_helper(employee))
     
     return {
         "employees": employees,
@@ -113,7 +151,9 @@ async def get_employee(employee_id: str):
     """
     db = get_database()
     
-    employee = await db.employees.find_one({"employee_id": employee_id})
+    employee = await db.employees.find_one(
+        {"employee_id": employee_id, **ACTIVE_EMPLOYEE_FILTER}, EMPLOYEE_PROJECTION
+    )
     
     if not employee:
         raise HTTPException(
@@ -135,24 +175,31 @@ async def get_employee(employee_id: str):
 async def delete_employee(employee_id: str):
     """
     Delete an employee by their employee ID.
-    Also removes all associated attendance records.
+    The employee is soft-deleted; it and its attendance records are
+    purged in the background after the retention period.
     """
     db = get_database()
     
-    # Check if employee exists
-    employee = await db.employees.find_one({"employee_id": employee_id})
+    # Mark employee as deleted
+    deleted_at = datetime.utcnow()
+    result = await db.employees.update_one(
+        {"employee_id": employee_id, **ACTIVE_EMPLOYEE_FILTER},
+        {"$set": {"deleted_at": deleted_at}}
+    )
     
-    if not employee:
+    if result.matched_count == 0:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Employee with ID '{employee_id}' not found"
         )
     
-    # Delete employee
-    await db.employees.delete_one({"employee_id": employee_id})
+    # Flag attendance so it is hidden until purged, and a reused ID starts clean
+    await db.attendance.update_many(
+        {"employee_id": employee_id, **ACTIVE_ATTENDANCE_FILTER},
+        {"$set": {"deleted_at": deleted_at}}
+    )
     
-    # Delete associated attendance records
-    await db.attendance.delete_many({"employee_id": employee_id})
+    await invalidate_employee_cache()
     
     return None
 @router.put(
@@ -173,7 +220,9 @@ async def update_employee(employee_id: str, employee_update: EmployeeCreate):
     db = get_database()
     
     # Check if employee exists
-    existing = await db.employees.find_one({"employee_id": employee_id})
+    existing = await db.employees.find_one(
+        {"employee_id": employee_id, **ACTIVE_EMPLOYEE_FILTER}, EXISTS_PROJECTION
+    )
     if not existing:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -183,7 +232,10 @@ async def update_employee(employee_id: str, employee_update: EmployeeCreate):
     # Check if the new info causes a conflict with ANOTHER employee
     # Check employee_id conflict (only if changing it, though here we use it as URL param)
     if employee_update.employee_id != employee_id:
-        conflict_id = await db.employees.find_one({"employee_id": employee_update.employee_id})
+        conflict_id = await db.employees.find_one(
+            {"employee_id": employee_update.employee_id, **ACTIVE_EMPLOYEE_FILTER},
+            EXISTS_PROJECTION
+        )
         if conflict_id:
             raise HTTPException(
                 status_code=status.HTTP_409_CONFLICT,
@@ -193,8 +245,9 @@ async def update_employee(employee_id: str, employee_update: EmployeeCreate):
     # Check email conflict
     conflict_email = await db.employees.find_one({
         "email": employee_update.email,
-        "employee_id": {"$ne": employee_id}
-    })
+        "employee_id": {"$ne": employee_id},
+        **ACTIVE_EMPLOYEE_FILTER
+    }, EXISTS_PROJECTION)
     if conflict_email:
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
@@ -204,7 +257,7 @@ async def update_employee(employee_id: str, employee_update: EmployeeCreate):
     # Update employee
     update_data = employee_update.model_dump()
     await db.employees.update_one(
-        {"employee_id": employee_id},
+        {"employee_id": employee_id, **ACTIVE_EMPLOYEE_FILTER},
         {"$set": update_data}
     )
     
@@ -212,10 +265,15 @@ async def update_employee(employee_id: str, employee_update: EmployeeCreate):
     # (In this simple schema, attendance stores employee_id. If employee_id changed, update records)
     if employee_update.employee_id != employee_id:
         await db.attendance.update_many(
-            {"employee_id": employee_id},
+            {"employee_id": employee_id, **ACTIVE_ATTENDANCE_FILTER},
             {"$set": {"employee_id": employee_update.employee_id}}
         )
     
+    await invalidate_employee_cache()
+    
     # Fetch updated employee
-    updated = await db.employees.find_one({"employee_id": employee_update.employee_id})
+    updated = await db.employees.find_one(
+        {"employee_id": employee_update.employee_id, **ACTIVE_EMPLOYEE_FILTER},
+        EMPLOYEE_PROJECTION
+    )
     return employee_helper(updated)